@@ -18,7 +18,35 @@ Currently we support the following DAQ data formats:
   - `Struck SIS3316 <https://www.struck.de/sis3316.html>`_
 """
 
+import sys as _sys
+import types as _types
+
 from ._version import version as __version__
-from .build_raw import build_raw
 
 __all__ = ["build_raw", "__version__"]
+
+
+def __getattr__(name):
+    # build_raw pulls in all streamers and their dependencies: only import it
+    # when it's actually requested (PEP 562), e.g. not for the CLI's --version
+    if name == "build_raw":
+        from .build_raw import build_raw
+
+        return build_raw
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+class _Daq2lh5Module(_types.ModuleType):
+    def __setattr__(self, name, value):
+        # importing the build_raw submodule binds it as a package attribute,
+        # which would shadow the exported build_raw() function
+        if name == "build_raw" and isinstance(value, _types.ModuleType):
+            value = value.build_raw
+        super().__setattr__(name, value)
+
+
+_sys.modules[__name__].__class__ = _Daq2lh5Module
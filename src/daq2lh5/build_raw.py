@@ -77,7 +77,11 @@ def build_raw(
 
     hdf5_settings
         keyword arguments (as a dict) forwarded to
-        :meth:`lgdo.lh5.store.LH5Store.write`.
+        :meth:`lgdo.lh5.store.LH5Store.write`. Filters registered by
+        :mod:`hdf5plugin` can be used as well, e.g. Blosc with LZ4 and a
+        bit-shuffle is typically faster than ``lzf`` on waveforms at a similar
+        compression ratio: ``hdf5plugin.Blosc(cname="lz4", clevel=1,
+        shuffle=hdf5plugin.Blosc.BITSHUFFLE)``.
 
     **kwargs
         sent to :class:`.RawBufferLibrary` generation as `kw_dict` argument.
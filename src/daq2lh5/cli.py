@@ -2,13 +2,16 @@
 
 from __future__ import annotations
 
-import argparse
 import os
 import sys
 
-import numpy as np
 
-from . import __version__, build_raw, logging
+def _print_version_and_exit():
+    """Print the legend-daq2lh5 version and exit."""
+    from . import __version__
+
+    print(__version__)  # noqa: T201
+    sys.exit()
 
 
 def daq2lh5_cli():
@@ -24,6 +27,11 @@ def daq2lh5_cli():
 
       $ legend-daq2lh5 --help
     """
+    # answer a bare version query without paying for argparse
+    if sys.argv[1:] == ["--version"]:
+        _print_version_and_exit()
+
+    import argparse
 
     parser = argparse.ArgumentParser(
         prog="daq2lh5", description="Convert data into LEGEND HDF5 (LH5) raw format"
@@ -71,7 +79,7 @@ def daq2lh5_cli():
         "--max-rows",
         "-n",
         type=int,
-        default=np.inf,
+        default=float("inf"),
         help="""Maximum number of rows of data to process from the input
                 file""",
     )
@@ -81,6 +89,13 @@ def daq2lh5_cli():
 
     args = parser.parse_args()
 
+    # --version given together with other options
+    if args.version:
+        _print_version_and_exit()
+
+    # heavy imports are deferred until we know we have data to convert
+    from . import build_raw, logging
+
     if args.verbose:
         logging.setup(logging.DEBUG)
     elif args.debug:
@@ -88,10 +103,6 @@ def daq2lh5_cli():
     else:
         logging.setup()
 
-    if args.version:
-        print(__version__)  # noqa: T201
-        sys.exit()
-
     for stream in args.in_stream:
         basename = os.path.splitext(os.path.basename(stream))[0]
         build_raw(
@@ -1,15 +1,33 @@
 from __future__ import annotations
 
 import logging
+from typing import TYPE_CHECKING
 
-import fcutils
 import lgdo
 import numpy as np
 
 from ..data_decoder import DataDecoder
 
+if TYPE_CHECKING:
+    import fcutils
+
 log = logging.getLogger(__name__)
 
+fc_config_fields = (
+    "nsamples",  # samples per channel
+    "nadcs",  # number of adc channels
+    "ntriggers",  # number of triggertraces
+    "telid",  # id of telescope
+    "adcbits",  # bit range of the adc channels
+    "sumlength",  # length of the fpga integrator
+    "blprecision",  # precision of the fpga baseline
+    "mastercards",  # number of attached mastercards
+    "triggercards",  # number of attached triggercards
+    "adccards",  # number of attached fadccards
+    "gps",  # gps mode (0: not used, 1: external pps and 10MHz)
+)
+"""Names of the ``FCIOConfig`` members, as exposed by :class:`fcutils.fcio`."""
+
 
 class FCConfigDecoder(DataDecoder):
     """Decode FlashCam config data.
@@ -36,24 +54,17 @@ class FCConfigDecoder(DataDecoder):
         self.config = lgdo.Struct()
 
     def decode_config(self, fcio: fcutils.fcio) -> lgdo.Struct:
-        config_names = [
-            "nsamples",  # samples per channel
-            "nadcs",  # number of adc channels
-            "ntriggers",  # number of triggertraces
-            "telid",  # id of telescope
-            "adcbits",  # bit range of the adc channels
-            "sumlength",  # length of the fpga integrator
-            "blprecision",  # precision of the fpga baseline
-            "mastercards",  # number of attached mastercards
-            "triggercards",  # number of attached triggercards
-            "adccards",  # number of attached fadccards
-            "gps",  # gps mode (0: not used, 1: external pps and 10MHz)
-        ]
-        for name in config_names:
+        # all config fields are int32: read them into one array
+        values = np.fromiter(
+            (getattr(fcio, name) for name in fc_config_fields),
+            dtype=np.int32,
+            count=len(fc_config_fields),
+        )
+        for name, value in zip(fc_config_fields, values):
             if name in self.config:
-                log.warning(f"{name} already in self.config. skipping...")
+                # e.g. a new file was opened: refresh the stored value
+                self.config[name].value = value
                 continue
-            value = np.int32(getattr(fcio, name))  # all config fields are int32
             self.config.add_field(name, lgdo.Scalar(value))
         return self.config
 
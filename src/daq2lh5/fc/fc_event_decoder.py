@@ -1,13 +1,16 @@
 from __future__ import annotations
 
-import copy
 import logging
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import fcutils
 import lgdo
+import numpy as np
 
 from ..data_decoder import DataDecoder
+from ..raw_buffer import RawBuffer
+
+if TYPE_CHECKING:
+    import fcutils
 
 log = logging.getLogger(__name__)
 
@@ -92,11 +95,20 @@ class FCEventDecoder(DataDecoder):
     """Decode FlashCam digitizer event data."""
 
     def __init__(self, *args, **kwargs) -> None:
-        # these are read for every event (decode_event)
-        self.decoded_values = copy.deepcopy(fc_decoded_values)
+        # these are read for every event (decode_event). Only the per-field
+        # dicts get modified (see set_file_config), so a copy of each of them
+        # is enough and much cheaper than a deepcopy
+        self.decoded_values = {k: v.copy() for k, v in fc_decoded_values.items()}
         super().__init__(*args, **kwargs)
         self.skipped_channels = {}
         self.fc_config = None
+        # values from fc_config used in decode_packet, set in set_file_config
+        self._nadcs = None
+        self._nsamples = None
+        # channel -> buffer lookup built from evt_rbkd, see _set_rb_lookup()
+        self._rb_lookup_dict = None
+        self._rb_list = []
+        self._rb_index = None
 
     def set_file_config(self, fc_config: lgdo.Struct) -> None:
         """Access ``FCIOConfig`` members once when each file is opened.
@@ -107,8 +119,30 @@ class FCEventDecoder(DataDecoder):
             extracted via :meth:`~.fc_config_decoder.FCConfigDecoder.decode_config`.
         """
         self.fc_config = fc_config
-        self.decoded_values["waveform"]["wf_len"] = self.fc_config["nsamples"].value
-        self.decoded_values["tracelist"]["length_guess"] = self.fc_config["nadcs"].value
+        self._nadcs = self.fc_config["nadcs"].value
+        self._nsamples = self.fc_config["nsamples"].value
+        self.decoded_values["waveform"]["wf_len"] = self._nsamples
+        self.decoded_values["tracelist"]["length_guess"] = self._nadcs
+        self._rb_lookup_dict = None
+
+    def _set_rb_lookup(self, evt_rbkd: dict[int, RawBuffer]) -> None:
+        """Build the channel-to-buffer lookup used by :meth:`decode_packet`.
+
+        `self._rb_index[iwf]` is the position in `self._rb_list` of the buffer
+        that channel `iwf` is written to, or -1 if the channel is not read out.
+        """
+        self._rb_list = []
+        positions = {}
+        n_channels = max([self._nadcs, *evt_rbkd.keys()]) + 1
+        self._rb_index = np.full(n_channels, -1, dtype="int32")
+        for iwf, rb in evt_rbkd.items():
+            if id(rb) not in positions:
+                positions[id(rb)] = len(self._rb_list)
+                self._rb_list.append(rb)
+            self._rb_index[iwf] = positions[id(rb)]
+        # a copy of evt_rbkd: compares equal only as long as the same channels
+        # are mapped to the same RawBuffer objects
+        self._rb_lookup_dict = dict(evt_rbkd)
 
     def get_key_lists(self) -> range:
         return [list(range(self.fc_config["nadcs"].value))]
@@ -148,67 +182,138 @@ class FCEventDecoder(DataDecoder):
         """
         any_full = False
 
-        # a list of channels is read out simultaneously for each event
-        for iwf in fcio.tracelist:
-            if iwf not in evt_rbkd:
+        # the fcio attributes are the same for all channels in the event: read
+        # them once here rather than once per channel in the loop below
+        nsamples = fcio.nsamples
+        eventnumber = fcio.eventnumber  # the eventnumber since start of file
+        eventtime = fcio.eventtime  # the time since epoch in seconds
+        runtime = fcio.runtime  # the time since the beginning of the file in seconds
+        numtraces = fcio.numtraces  # number of triggered adcs
+        tracelist = np.asarray(fcio.tracelist)  # list of triggered adcs
+        n_traces = len(tracelist)
+        baseline = fcio.baseline  # the fpga baseline values for each channel in LSB
+        daqenergy = fcio.daqenergy  # the fpga energy values for each channel in LSB
+        traces = fcio.traces
+        ts_pps = fcio.timestamp_pps
+        ts_ticks = fcio.timestamp_ticks
+        ts_maxticks = fcio.timestamp_maxticks
+        mu_offset_sec = fcio.timeoffset_mu_sec
+        mu_offset_usec = fcio.timeoffset_mu_usec
+        to_master_sec = fcio.timeoffset_master_sec
+        delta_mu_usec = fcio.timeoffset_dt_mu_usec
+        abs_delta_mu_usec = fcio.timeoffset_abs_mu_usec
+        to_start_sec = fcio.timeoffset_start_sec
+        to_start_usec = fcio.timeoffset_start_usec
+        dr_start_pps = fcio.deadregion_start_pps
+        dr_start_ticks = fcio.deadregion_start_ticks
+        dr_stop_pps = fcio.deadregion_stop_pps
+        dr_stop_ticks = fcio.deadregion_stop_ticks
+        dr_maxticks = fcio.deadregion_maxticks
+        deadtime = fcio.deadtime
+
+        # all buffers were allocated with the wf_len set in set_file_config()
+        if nsamples != self._nsamples:
+            log.warning(
+                "event wf length was %d when %d were expected",
+                nsamples,
+                self._nsamples,
+            )
+
+        # a list of channels is read out simultaneously for each event. Look up
+        # the buffer of each of them at once, with -1 marking skipped channels
+        if evt_rbkd != self._rb_lookup_dict:
+            self._set_rb_lookup(evt_rbkd)
+        rb_index = self._rb_index[tracelist]
+        is_read = rb_index >= 0
+        all_read = bool(is_read.all())
+        if not all_read:
+            for iwf in tracelist[~is_read].tolist():
                 if iwf not in self.skipped_channels:
                     # TODO: should this be a warning instead?
-                    log.debug(f"skipping packets from channel {iwf}...")
+                    log.debug("skipping packets from channel %d...", iwf)
                     self.skipped_channels[iwf] = 0
                 self.skipped_channels[iwf] += 1
-                continue
-            tbl = evt_rbkd[iwf].lgdo
-            if fcio.nsamples != tbl["waveform"]["values"].nda.shape[1]:
-                log.warning(
-                    "event wf length was",
-                    fcio.nsamples,
-                    "when",
-                    self.decoded_values["waveform"]["wf_len"],
-                    "were expected",
+
+        # group the channels by buffer, so that each buffer gets filled with a
+        # single set of (vectorized) stores below
+        if len(self._rb_list) == 0:
+            rb_channels = []
+        elif len(self._rb_list) == 1:
+            rb_channels = [(0, tracelist if all_read else tracelist[is_read])]
+        else:
+            # count the rows for each buffer and sort the channels by buffer in
+            # one go. The sort is stable to keep the tracelist order within each
+            # buffer, and the skipped channels (-1) end up in front
+            n_rows = np.bincount(rb_index[is_read], minlength=len(self._rb_list))
+            ends = np.cumsum(n_rows)
+            by_rb = tracelist[np.argsort(rb_index, kind="stable")][
+                n_traces - ends[-1] :
+            ]
+            rb_channels = [
+                (irb, by_rb[ends[irb] - n_rows[irb] : ends[irb]])
+                for irb in np.flatnonzero(n_rows).tolist()
+            ]
+
+        for irb, channels in rb_channels:
+            rb = self._rb_list[irb]
+            tbl = rb.lgdo
+            rows = slice(rb.loc, rb.loc + len(channels))
+
+            # fill the table: one row per channel, event-level values are
+            # broadcast to all rows. Look the columns up every time: buffer
+            # processing may replace their arrays between two flushes
+            tbl["channel"].nda[rows] = channels
+            tbl["packet_id"].nda[rows] = packet_id
+            tbl["eventnumber"].nda[rows] = eventnumber
+            tbl["timestamp"].nda[rows] = eventtime
+            tbl["runtime"].nda[rows] = runtime
+            tbl["numtraces"].nda[rows] = numtraces
+            if len(channels) > 0:
+                # all rows get the same list: set them with a single call to
+                # the compiled VectorOfVectors fill kernel
+                tbl["tracelist"]._set_vector_unsafe(
+                    rows.start,
+                    np.broadcast_to(tracelist, (len(channels), n_traces)),
+                    lens=np.full(len(channels), n_traces, dtype="uint32"),
                 )
-            ii = evt_rbkd[iwf].loc
-
-            # fill the table
-            tbl["channel"].nda[ii] = iwf
-            tbl["packet_id"].nda[ii] = packet_id
-            tbl["eventnumber"].nda[
-                ii
-            ] = fcio.eventnumber  # the eventnumber since the beginning of the file
-            tbl["timestamp"].nda[ii] = fcio.eventtime  # the time since epoch in seconds
-            tbl["runtime"].nda[
-                ii
-            ] = fcio.runtime  # the time since the beginning of the file in seconds
-            tbl["numtraces"].nda[ii] = fcio.numtraces  # number of triggered adcs
-            tbl["tracelist"]._set_vector_unsafe(
-                ii, fcio.tracelist
-            )  # list of triggered adcs
-            tbl["baseline"].nda[ii] = fcio.baseline[
-                iwf
-            ]  # the fpga baseline values for each channel in LSB
-            tbl["daqenergy"].nda[ii] = fcio.daqenergy[
-                iwf
-            ]  # the fpga energy values for each channel in LSB
-            tbl["ts_pps"].nda[ii] = fcio.timestamp_pps
-            tbl["ts_ticks"].nda[ii] = fcio.timestamp_ticks
-            tbl["ts_maxticks"].nda[ii] = fcio.timestamp_maxticks
-            tbl["mu_offset_sec"].nda[ii] = fcio.timeoffset_mu_sec
-            tbl["mu_offset_usec"].nda[ii] = fcio.timeoffset_mu_usec
-            tbl["to_master_sec"].nda[ii] = fcio.timeoffset_master_sec
-            tbl["delta_mu_usec"].nda[ii] = fcio.timeoffset_dt_mu_usec
-            tbl["abs_delta_mu_usec"].nda[ii] = fcio.timeoffset_abs_mu_usec
-            tbl["to_start_sec"].nda[ii] = fcio.timeoffset_start_sec
-            tbl["to_start_usec"].nda[ii] = fcio.timeoffset_start_usec
-            tbl["dr_start_pps"].nda[ii] = fcio.deadregion_start_pps
-            tbl["dr_start_ticks"].nda[ii] = fcio.deadregion_start_ticks
-            tbl["dr_stop_pps"].nda[ii] = fcio.deadregion_stop_pps
-            tbl["dr_stop_ticks"].nda[ii] = fcio.deadregion_stop_ticks
-            tbl["dr_maxticks"].nda[ii] = fcio.deadregion_maxticks
-            tbl["deadtime"].nda[ii] = fcio.deadtime
+            tbl["baseline"].nda[rows] = baseline[channels]
+            tbl["daqenergy"].nda[rows] = daqenergy[channels]
+            tbl["ts_pps"].nda[rows] = ts_pps
+            tbl["ts_ticks"].nda[rows] = ts_ticks
+            tbl["ts_maxticks"].nda[rows] = ts_maxticks
+            tbl["mu_offset_sec"].nda[rows] = mu_offset_sec
+            tbl["mu_offset_usec"].nda[rows] = mu_offset_usec
+            tbl["to_master_sec"].nda[rows] = to_master_sec
+            tbl["delta_mu_usec"].nda[rows] = delta_mu_usec
+            tbl["abs_delta_mu_usec"].nda[rows] = abs_delta_mu_usec
+            tbl["to_start_sec"].nda[rows] = to_start_sec
+            tbl["to_start_usec"].nda[rows] = to_start_usec
+            tbl["dr_start_pps"].nda[rows] = dr_start_pps
+            tbl["dr_start_ticks"].nda[rows] = dr_start_ticks
+            tbl["dr_stop_pps"].nda[rows] = dr_stop_pps
+            tbl["dr_stop_ticks"].nda[rows] = dr_stop_ticks
+            tbl["dr_maxticks"].nda[rows] = dr_maxticks
+            tbl["deadtime"].nda[rows] = deadtime
 
             # if len(traces[iwf]) != fcio.nsamples: # number of sample per trace check
-            tbl["waveform"]["values"].nda[ii][:] = fcio.traces[iwf]
+            waveform = tbl["waveform"]["values"].nda
+            if waveform.dtype == traces.dtype:
+                # gather straight into the buffer rows, without a temporary.
+                # mode="raise" would buffer the output, so check the channels here
+                if len(channels) > 0 and not (
+                    -len(traces) <= channels.min() and channels.max() < len(traces)
+                ):
+                    bad = channels[
+                        (channels < -len(traces)) | (channels >= len(traces))
+                    ]
+                    raise IndexError(
+                        f"index {bad[0]} is out of bounds for axis 0 with size {len(traces)}"
+                    )
+                np.take(traces, channels, axis=0, out=waveform[rows], mode="wrap")
+            else:
+                waveform[rows] = traces[channels]
 
-            evt_rbkd[iwf].loc += 1
-            any_full |= evt_rbkd[iwf].is_full()
+            rb.loc = rows.stop
+            any_full |= rb.is_full()
 
         return bool(any_full)
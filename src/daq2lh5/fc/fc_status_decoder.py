@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-import fcutils
+from typing import TYPE_CHECKING
 
 from ..data_decoder import DataDecoder
 from ..raw_buffer import RawBuffer
 
+if TYPE_CHECKING:
+    import fcutils
+
 
 class FCStatusDecoder(DataDecoder):
     """Decode FlashCam digitizer status data."""
@@ -66,9 +69,10 @@ class FCStatusDecoder(DataDecoder):
         tbl["status"].nda[ii] = fcio.status
 
         # times
-        tbl["statustime"].nda[ii] = fcio.statustime[0] + fcio.statustime[1] / 1e6
-        tbl["cputime"].nda[ii] = fcio.statustime[2] + fcio.statustime[3] / 1e6
-        tbl["startoffset"].nda[ii] = fcio.statustime[5] + fcio.statustime[6] / 1e6
+        statustime = fcio.statustime
+        tbl["statustime"].nda[ii] = statustime[0] + statustime[1] / 1e6
+        tbl["cputime"].nda[ii] = statustime[2] + statustime[3] / 1e6
+        tbl["startoffset"].nda[ii] = statustime[5] + statustime[6] / 1e6
 
         # Total number of cards (number of status data to follow)
         tbl["cards"].nda[ii] = fcio.cards
@@ -9,6 +9,7 @@ from __future__ import annotations
 
 import logging
 
+import numba
 import numpy as np
 import numpy.typing as npt
 
@@ -39,6 +40,20 @@ def get_data_id(packet: OrcaPacket, shift: bool = True) -> np.uint32:
     return packet[0] & 0xFFFC0000
 
 
+@numba.njit(cache=True)
+def decode_header(header: np.uint32) -> tuple[bool, int, int]:
+    """Decode a packet header word in one go.
+
+    Returns whether the packet is short, its number of words and its unshifted
+    data ID, the same as :func:`is_short`, :func:`get_n_words` and
+    :func:`get_data_id` with ``shift=False`` would return. Can also be
+    called from other numba-compiled functions.
+    """
+    if header >> 31:
+        return True, 1, header & 0xFC000000
+    return False, header & 0x3FFFF, header & 0xFFFC0000
+
+
 def hex_dump(
     packet: OrcaPacket,
     shift_data_id: bool = True,
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
 import gzip
+import io
 import json
 import logging
+import mmap
+import os
 
+import numba
 import numpy as np
 
 from ..data_streamer import DataStreamer
@@ -25,20 +29,171 @@ from .orca_run_decoder import ORRunDecoderForRun  # noqa: F401
 
 log = logging.getLogger(__name__)
 
+index_file_suffix = ".orcaidx"
+"""Suffix appended to an ORCA file name to get the name of its index file."""
+
+_index_file_magic = int.from_bytes(b"ORCAIDX1", "little")
+
+# number of packets read_packet() looks ahead at once on memory-mapped streams.
+# Start small so that reading only a few packets stays cheap
+_next_wanted_min_window = 64
+_next_wanted_max_window = 1 << 16
+
+
+@numba.njit(cache=True)
+def _scan_packet_locs(
+    words: np.ndarray, start: int, max_locs: int
+) -> tuple[np.ndarray, int]:
+    """Walk the packet headers in `words`, starting at word index `start`.
+
+    Returns the word index of each packet found (at most `max_locs` of them)
+    and the word index where the scan stopped: after the last packet found, at
+    the end of `words`, or at a packet claiming zero length.
+    """
+    locs = np.empty(min(1024, max_locs), dtype=np.int64)
+    n_locs = 0
+    pos = start
+    while pos < len(words) and n_locs < max_locs:
+        if n_locs == len(locs):
+            grown = np.empty(min(2 * len(locs), max_locs), dtype=np.int64)
+            grown[:n_locs] = locs
+            locs = grown
+        n_words = orca_packet.decode_header(words[pos])[1]
+        if n_words == 0:
+            break
+        locs[n_locs] = pos
+        n_locs += 1
+        pos += n_words
+    return locs[:n_locs], pos
+
+
+def _advise_sequential(stream) -> None:
+    """Tell the kernel that the file behind `stream` will be read front to back.
+
+    This makes it read ahead more aggressively. Does nothing where
+    :func:`os.posix_fadvise` is not available.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        os.posix_fadvise(stream.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    except (AttributeError, OSError, ValueError):  # e.g. no file descriptor
+        log.debug("could not advise sequential access on the input stream")
+
+
+@numba.njit(cache=True)
+def _find_next_wanted(headers: np.ndarray, wanted_ids: np.ndarray) -> np.ndarray:
+    """For each packet header in `headers`, find the next wanted packet.
+
+    Returns the index of the first packet at or after each one whose unshifted
+    data ID `data_id` has ``wanted_ids[data_id >> 18]`` set, or ``len(headers)``
+    if there is none.
+    """
+    next_wanted = np.empty(len(headers), dtype=np.int64)
+    index = len(headers)
+    for ii in range(len(headers) - 1, -1, -1):
+        if wanted_ids[orca_packet.decode_header(headers[ii])[2] >> 18]:
+            index = ii
+        next_wanted[ii] = index
+    return next_wanted
+
+
+class _MappedFile:
+    """Read-only file object backed by a memory map of the whole file.
+
+    Implements the subset of the binary file interface used by
+    :class:`OrcaStreamer` (``read``, ``readinto``, ``seek``, ``tell``,
+    ``close``) on top of :class:`mmap.mmap`, so that moving around and reading
+    the file never goes through the kernel once its pages are cached. The file
+    content is also exposed as a :class:`numpy.uint32` array (:attr:`words`)
+    for direct access to the packet words.
+    """
+
+    def __init__(self, file) -> None:
+        self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            # packets are mostly read front to back: ask for aggressive read-ahead
+            self._mmap.madvise(mmap.MADV_SEQUENTIAL)
+        self._view = memoryview(self._mmap)
+        self.size = len(self._mmap)
+        self.words = np.frombuffer(self._mmap, dtype="uint32", count=self.size // 4)
+        self.pos = 0
+
+    def tell(self) -> int:
+        return self.pos
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if whence == 1:
+            offset += self.pos
+        elif whence == 2:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+        self.pos = offset  # like for regular files, seeking past EOF is allowed
+        return self.pos
+
+    def read(self, size: int = -1) -> bytes:
+        stop = self.size if size < 0 else min(self.pos + size, self.size)
+        data = self._view[self.pos : stop].tobytes()
+        self.pos = max(self.pos, stop)
+        return data
+
+    def readinto(self, buffer) -> int:
+        dest = memoryview(buffer).cast("B")
+        n_bytes = max(0, min(len(dest), self.size - self.pos))
+        dest[:n_bytes] = self._view[self.pos : self.pos + n_bytes]
+        self.pos += n_bytes
+        return n_bytes
+
+    def close(self) -> None:
+        self.words = None
+        self._view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # someone still holds a view of the data: the map goes away together
+            # with the last view
+            pass
 
-class OrcaStreamer(DataStreamer):
-    """Data streamer for ORCA data."""
 
-    def __init__(self) -> None:
+class OrcaStreamer(DataStreamer):
+    """Data streamer for ORCA data.
+
+    Parameters
+    ----------
+    use_index_file
+        if ``True``, the packet locations are saved to an index file next to
+        the ORCA file (its name plus :data:`index_file_suffix`) once the whole
+        file has been scanned, and loaded back from it when the file is opened
+        again, so that the scan need not be repeated.
+    """
+
+    def __init__(self, use_index_file: bool = False) -> None:
         super().__init__()
+        self.use_index_file = use_index_file
         self.in_stream = None
-        self.packet_locs = []
+        self._stream_name = None
+        self._index_file_loaded = False
+        self._words = None  # uint32 view of the stream, if it is memory-mapped
+        self._wanted_ids = None  # see open_stream()
+        # next wanted packets for a window of packets, see _update_next_wanted()
+        self._next_wanted = None
+        self._next_wanted_start = 0
+        self._next_wanted_window = _next_wanted_min_window
+        # packet locations found so far, see packet_locs
+        self._packet_locs = np.empty(1024, dtype=np.int64)
+        self._n_packet_locs = 0
+        # check packet positions against the known locations (e.g. in tests)
+        self._validate = False
         self.buffer = np.empty(1024, dtype="uint32")  # start with a 4 kB packet buffer
         self.header = None
         self.header_decoder = OrcaHeaderDecoder()
         self.decoder_id_dict = {}  # dict of data_id to decoder object
         self.rbl_id_dict = {}  # dict of RawBufferLists for each data_id
-        self.missing_decoders = []
+        self.missing_decoders = set()  # data_ids without a decoder implementation
+        self._last_data_id = None  # unshifted data_id of the last loaded packet
+        self._id_to_dec_name_dict = {}  # data_id (unshifted) to decoder name
+        self._id_action = {}  # data_id to (decoder, rbl) for packets to decode
 
     def load_packet_header(self) -> np.uint32 | None:
         """Loads the packet header at the current read location into the buffer
@@ -46,27 +201,39 @@ class OrcaStreamer(DataStreamer):
         and updates internal variables.
         """
         pkt_hdr = self.buffer[:1]
-        n_bytes_read = self.in_stream.readinto(pkt_hdr)  # buffer is at least 4 kB long
-        self.n_bytes_read += n_bytes_read
-        if n_bytes_read == 0:  # EOF
-            return None
-        if n_bytes_read != 4:
-            raise RuntimeError(f"only got {n_bytes_read} bytes for packet header")
+        if self._words is not None and self.in_stream.pos + 4 <= self.in_stream.size:
+            # mapped file: take the header straight from the mapped words
+            # (packets always start at a word boundary)
+            filepos = self.in_stream.pos
+            pkt_hdr[0] = self._words[filepos >> 2]
+            self.in_stream.pos = filepos + 4
+            self.n_bytes_read += 4
+        else:
+            n_bytes_read = self.in_stream.readinto(pkt_hdr)  # buffer is >= 4 kB long
+            self.n_bytes_read += n_bytes_read
+            if n_bytes_read == 0:  # EOF
+                return None
+            if n_bytes_read != 4:
+                raise RuntimeError(f"only got {n_bytes_read} bytes for packet header")
+            filepos = self.in_stream.tell() - n_bytes_read
 
         # packet is valid. Can set the packet_id and log its location
         self.packet_id += 1
-        filepos = self.in_stream.tell() - n_bytes_read
-        if self.packet_id < len(self.packet_locs):
-            if self.packet_locs[self.packet_id] != filepos:
+        if self.packet_id < self._n_packet_locs:
+            if self._validate and self._packet_locs[self.packet_id] != filepos:
                 raise RuntimeError(
-                    f"filepos for packet {self.packet_id} was {filepos} but {self.packet_locs[self.packet_id]} was expected"
+                    f"filepos for packet {self.packet_id} was {filepos} but {self._packet_locs[self.packet_id]} was expected"
                 )
         else:
-            if len(self.packet_locs) != self.packet_id:
+            if self.packet_id > self._n_packet_locs:
                 raise RuntimeError(
-                    f"loaded packet {self.packet_id} after packet {len(self.packet_locs)-1}"
+                    f"loaded packet {self.packet_id} after packet {self._n_packet_locs-1}"
                 )
-            self.packet_locs.append(filepos)
+            if self._n_packet_locs < len(self._packet_locs):
+                self._packet_locs[self._n_packet_locs] = filepos
+                self._n_packet_locs += 1
+            else:
+                self._add_packet_locs([filepos])
 
         return pkt_hdr
 
@@ -89,22 +256,99 @@ class OrcaStreamer(DataStreamer):
             pkt_hdr = self.load_packet_header()
             if pkt_hdr is None:
                 return False
-            self.in_stream.seek((orca_packet.get_n_words(pkt_hdr) - 1) * 4, 1)
+            n_bytes = (orca_packet.decode_header(pkt_hdr[0])[1] - 1) * 4
+            if self._words is not None:
+                self.in_stream.pos += n_bytes
+            else:
+                self.in_stream.seek(n_bytes, 1)
             n -= 1
         return True
 
+    @property
+    def packet_locs(self) -> np.ndarray:
+        """Locations (in bytes from the start of the stream) of the packets
+        found so far, as an :class:`numpy.int64` array.
+        """
+        return self._packet_locs[: self._n_packet_locs]
+
+    def _add_packet_locs(self, locs: list[int] | np.ndarray) -> None:
+        """Append to :attr:`packet_locs`, growing its storage geometrically."""
+        n_locs = self._n_packet_locs + len(locs)
+        if n_locs > len(self._packet_locs):
+            grown = np.empty(max(n_locs, 2 * len(self._packet_locs)), dtype=np.int64)
+            grown[: self._n_packet_locs] = self.packet_locs
+            self._packet_locs = grown
+        self._packet_locs[self._n_packet_locs : n_locs] = locs
+        self._n_packet_locs = n_locs
+
     def build_packet_locs(self, saveloc=True) -> None:
         loc = self.in_stream.tell()
         pid = self.packet_id
-        if len(self.packet_locs) > 0:
-            self.in_stream.seek(self.packet_locs[-1])
-            self.packet_id = len(self.packet_locs) - 2
+        if self._n_packet_locs > 0:
+            self.in_stream.seek(int(self._packet_locs[self._n_packet_locs - 1]))
+            self.packet_id = self._n_packet_locs - 2
+        if self._words is not None:
+            # mapped file: walk the headers in compiled code
+            start = self.in_stream.pos >> 2
+            locs, stop = _scan_packet_locs(self._words, start, len(self._words))
+            if len(locs) > 0:
+                n_known = 1 if self._n_packet_locs > 0 else 0
+                self._add_packet_locs(locs[n_known:] * 4)
+                self.packet_id = self._n_packet_locs - 1
+                self.n_bytes_read += 4 * len(locs)
+            self.in_stream.pos = stop * 4
+            if stop < len(self._words):
+                raise RuntimeError(
+                    f"packet {self.packet_id + 1} at filepos {stop * 4} has zero length"
+                )
         while self.skip_packet():
             pass  # builds the rest of the packet_locs list
+        if self.use_index_file and not self._index_file_loaded:
+            self._save_index_file()
         if saveloc:
             self.in_stream.seek(loc)
             self.packet_id = pid
 
+    def _load_index_file(self) -> None:
+        """Seed the packet locations from the index file of the stream, if any.
+
+        The index file is ignored if its header does not match the current
+        size and modification time of the stream.
+        """
+        try:
+            stat = os.stat(self._stream_name)
+            index = np.fromfile(self._stream_name + index_file_suffix, dtype="<i8")
+        except (OSError, ValueError):
+            return
+        if len(index) < 3 or list(index[:3]) != [
+            _index_file_magic,
+            stat.st_size,
+            stat.st_mtime_ns,
+        ]:
+            log.debug(f"ignoring outdated index file for {self._stream_name}")
+            return
+        self._packet_locs = index[3:]
+        self._n_packet_locs = len(self._packet_locs)
+        self._index_file_loaded = True
+
+    def _save_index_file(self) -> None:
+        """Write the (complete) packet locations to the index file of the stream.
+
+        Failing to write the index file, e.g. in a read-only directory, is not
+        an error.
+        """
+        index_file = self._stream_name + index_file_suffix
+        try:
+            stat = os.stat(self._stream_name)
+            header = [_index_file_magic, stat.st_size, stat.st_mtime_ns]
+            index = np.concatenate([header, self.packet_locs]).astype("<i8")
+            index.tofile(index_file + ".tmp")
+            os.replace(index_file + ".tmp", index_file)
+        except OSError as e:
+            log.debug(f"could not write index file {index_file}: {e}")
+            return
+        self._index_file_loaded = True  # it is up to date now
+
     def count_packets(self, saveloc=True) -> None:
         self.build_packet_locs(saveloc=saveloc)
         return len(self.packet_locs)
@@ -135,7 +379,9 @@ class OrcaStreamer(DataStreamer):
         packet
             a view of the internal buffer spanning the packet data (uint32
             ndarray). If you want to hold on to the packet data while you load
-            more packets, you can call copy() on the view to make a copy.
+            more packets, you can call copy() on the view to make a copy. For
+            memory-mapped streams, long packets are returned as read-only views
+            of the mapped file instead.
         """
         if self.in_stream is None:
             raise RuntimeError("self.in_stream is None")
@@ -157,7 +403,7 @@ class OrcaStreamer(DataStreamer):
             while index >= len(self.packet_locs):
                 if not self.skip_packet():
                     return None
-            self.in_stream.seek(self.packet_locs[index])
+            self.in_stream.seek(int(self._packet_locs[index]))
             self.packet_id = index - 1
 
         # load packet header
@@ -166,22 +412,35 @@ class OrcaStreamer(DataStreamer):
             return None
 
         # if it's a short packet, we are done
-        if orca_packet.is_short(pkt_hdr):
+        is_short, n_words, data_id = orca_packet.decode_header(pkt_hdr[0])
+        self._last_data_id = data_id
+        if is_short:
             return pkt_hdr
 
-        # long packet: get length and check if we can skip it
-        n_words = orca_packet.get_n_words(pkt_hdr)
-        if (
-            skip_unknown_ids
-            and orca_packet.get_data_id(pkt_hdr, shift=False)
-            not in self.decoder_id_dict
-        ):
+        # long packet: check if we can skip it
+        if skip_unknown_ids and data_id not in self.decoder_id_dict:
             self.in_stream.seek((n_words - 1) * 4, 1)
             return pkt_hdr
 
-        # load into buffer, resizing as necessary
+        if self._words is not None:
+            # mapped file: hand out the packet words in place, without a copy
+            filepos = self.in_stream.pos
+            n_bytes_read = max(0, min((n_words - 1) * 4, self.in_stream.size - filepos))
+            self.in_stream.pos = filepos + n_bytes_read
+            self.n_bytes_read += n_bytes_read
+            if n_bytes_read == (n_words - 1) * 4:
+                start = (filepos >> 2) - 1
+                return self._words[start : start + n_words]
+            log.error(
+                f"only got {n_bytes_read} bytes for packet read when {(n_words-1)*4} were expected. Flushing all buffers and quitting..."
+            )
+            return None
+
+        # load into buffer, growing it geometrically as necessary
         if len(self.buffer) < n_words:
-            self.buffer.resize(n_words, refcheck=False)
+            buffer = np.empty(max(n_words, 2 * len(self.buffer)), dtype="uint32")
+            buffer[0] = self.buffer[0]  # the header was already loaded
+            self.buffer = buffer
         n_bytes_read = self.in_stream.readinto(self.buffer[1:n_words])
         self.n_bytes_read += n_bytes_read
         if n_bytes_read != (n_words - 1) * 4:
@@ -193,6 +452,87 @@ class OrcaStreamer(DataStreamer):
         # return just the packet
         return self.buffer[:n_words]
 
+    def load_packets(
+        self, indices: list[int], max_gap: int = 1 << 20
+    ) -> list[np.uint32 | None]:
+        """Loads several packets, given their indices in the file.
+
+        Packets that lie close to each other in the file are loaded together
+        with a single read. The read position of the stream is left unchanged.
+
+        Parameters
+        ----------
+        indices
+            indices of the packets to load, relative to the beginning of the
+            file.
+        max_gap
+            maximum number of bytes between two packets for them to be loaded
+            with the same read.
+
+        Returns
+        ----------
+        packets
+            the requested packets (uint32 ndarrays), in the order of `indices`.
+            They do not share memory with the internal buffer, so they stay
+            valid while more packets are loaded. ``None`` is returned for
+            out-of-range indices.
+        """
+        if self.in_stream is None:
+            raise RuntimeError("self.in_stream is None")
+
+        indices = [int(index) for index in indices]
+        if len(indices) > 0 and max(indices) + 1 >= len(self.packet_locs):
+            self.build_packet_locs()
+        n_packets = len(self.packet_locs)
+        wanted = sorted({index for index in indices if 0 <= index < n_packets})
+        if len(wanted) == 0:
+            return [None] * len(indices)
+
+        loc = self.in_stream.tell()
+        packets = {}
+
+        # byte ranges [start, stop) of the wanted packets
+        packet_locs = self.packet_locs.tolist()
+        starts = [packet_locs[index] for index in wanted]
+        stops = [
+            packet_locs[index + 1] if index + 1 < n_packets else None
+            for index in wanted
+        ]
+        if stops[-1] is None:
+            # the last packet in the file: its length is in its header
+            pkt_hdr = np.empty(1, dtype="uint32")
+            self.in_stream.seek(starts[-1])
+            if self.in_stream.readinto(pkt_hdr) == 4:
+                stops[-1] = starts[-1] + 4 * int(orca_packet.get_n_words(pkt_hdr))
+            else:
+                stops[-1] = starts[-1]
+
+        # group the packets into runs that are close enough to be read at once
+        groups = [[0]]
+        for ii in range(1, len(wanted)):
+            if starts[ii] - stops[groups[-1][-1]] <= max_gap:
+                groups[-1].append(ii)
+            else:
+                groups.append([ii])
+
+        for group in groups:
+            start = starts[group[0]]
+            data = np.empty((stops[group[-1]] - start) // 4, dtype="uint32")
+            self.in_stream.seek(start)
+            n_bytes_read = self.in_stream.readinto(data)
+            self.n_bytes_read += n_bytes_read
+            for ii in group:
+                first = (starts[ii] - start) // 4
+                last = (stops[ii] - start) // 4
+                if last == first or 4 * last > n_bytes_read:
+                    log.error(f"could not read all of packet {wanted[ii]}")
+                    packets[wanted[ii]] = None
+                    continue
+                packets[wanted[ii]] = data[first:last]
+
+        self.in_stream.seek(loc)
+        return [packets.get(index) for index in indices]
+
     def get_decoder_list(self) -> list[OrcaDecoder]:
         return list(self.decoder_id_dict.values())
 
@@ -200,14 +540,56 @@ class OrcaStreamer(DataStreamer):
         if self.in_stream is not None:
             self.close_in_stream()
         if stream_name.endswith(".gz"):
-            self.in_stream = gzip.open(stream_name.encode("utf-8"), "rb")
+            try:
+                import indexed_gzip
+            except ImportError:
+                # most reads are a few words long: serve them from a large buffer
+                # of decompressed data rather than going through GzipFile every time
+                self.in_stream = io.BufferedReader(
+                    gzip.open(stream_name.encode("utf-8"), "rb"), buffer_size=1 << 17
+                )
+            else:
+                # indexed_gzip records seek points while decompressing, so that
+                # jumping back to a packet does not restart from the beginning.
+                # Keep its default read buffer (4 x spacing): smaller buffers make
+                # sequential reading much slower
+                self.in_stream = indexed_gzip.IndexedGzipFile(
+                    stream_name, spacing=1 << 20, drop_handles=False
+                )
         else:
-            self.in_stream = open(stream_name.encode("utf-8"), "rb")
+            raw_file = open(stream_name.encode("utf-8"), "rb", buffering=0)
+            # map regular files into memory: reading packet headers and skipping
+            # over packets then costs no system calls
+            try:
+                mapped_file = _MappedFile(raw_file)
+            except (OSError, ValueError):  # e.g. an empty file
+                log.debug(f"could not memory-map {stream_name}, reading it instead")
+                self.in_stream = io.BufferedReader(raw_file, buffer_size=1 << 20)
+            else:
+                raw_file.close()
+                self.in_stream = mapped_file
+                self._words = mapped_file.words
+        if self._words is None:
+            _advise_sequential(self.in_stream)
         self.n_bytes_read = 0
 
+        # forget the packets of any previous stream
+        self._packet_locs = np.empty(1024, dtype=np.int64)
+        self._n_packet_locs = 0
+        self._next_wanted = None
+        self._next_wanted_start = 0
+        self._next_wanted_window = _next_wanted_min_window
+
+        self._stream_name = stream_name
+        self._index_file_loaded = False
+        if self.use_index_file:
+            self._load_index_file()
+
     def close_in_stream(self) -> None:
         if self.in_stream is None:
             raise RuntimeError("tried to close an unopened stream")
+        self._words = None
+        self._next_wanted = None
         self.in_stream.close()
         self.in_stream = None
 
@@ -215,36 +597,40 @@ class OrcaStreamer(DataStreamer):
         self.close_in_stream()
 
     def is_orca_stream(stream_name: str) -> bool:  # noqa: N805
-        orca = OrcaStreamer()
-        orca.set_in_stream(stream_name)
-        first_bytes = orca.in_stream.read(12)
-        orca.close_in_stream()
+        # only peek at the first bytes: no need to set up a full stream
+        if stream_name.endswith(".gz"):
+            with gzip.open(stream_name.encode("utf-8"), "rb") as gz_file:
+                first_bytes = gz_file.read(12)
+        else:
+            with open(stream_name.encode("utf-8"), "rb", buffering=0) as raw_file:
+                first_bytes = raw_file.read(12)
 
         # that read should have succeeded
         if len(first_bytes) != 12:
-            log.debug(f"first 12B read only returned {first_bytes}B: not orca")
+            log.debug(f"first 12B read only returned {len(first_bytes)}B: not orca")
             return False
 
         # first 14 bits should be zero
-        uints = np.frombuffer(first_bytes, dtype="uint32")
-        if (uints[0] & 0xFFFC0000) != 0:
+        n_words = int.from_bytes(first_bytes[0:4], "little")
+        if n_words & 0xFFFC0000:
             log.debug(
-                f"first fourteen bits non-zero ({uints[0] & 0xFFFC0000}): not orca"
+                f"first fourteen bits non-zero ({n_words & 0xFFFC0000}): not orca"
             )
             return False
 
         # xml header length should fit within header packet length
-        pad = uints[0] * 4 - 8 - uints[1]
+        n_xml_bytes = int.from_bytes(first_bytes[4:8], "little")
+        pad = n_words * 4 - 8 - n_xml_bytes
         if pad < 0 or pad > 3:
             log.debug(
-                f"header length = {uints[1]}B doesn't fit right within header packet length = {uints[0]*4-8}B: not orca"
+                f"header length = {n_xml_bytes}B doesn't fit right within header packet length = {n_words*4-8}B: not orca"
             )
             return False
 
         # last 4 chars should be '<?xm'
-        if first_bytes[8:].decode() != "<?xm":
+        if first_bytes[8:] != b"<?xm":
             log.debug(
-                f"last 4 chars of first 12 bytes = {first_bytes[8:].decode()} != '<?xm': not orca"
+                f"last 4 chars of first 12 bytes = {first_bytes[8:]} != b'<?xm': not orca"
             )
             return False
 
@@ -344,12 +730,13 @@ class OrcaStreamer(DataStreamer):
         id_to_dec_name_dict = self.header.get_id_to_decoder_name_dict(
             shift_data_id=False
         )
+        self._id_to_dec_name_dict = id_to_dec_name_dict
         instantiated_decoders = {"OrcaHeaderDecoder": self.header_decoder}
         for data_id in id_to_dec_name_dict.keys():
             name = id_to_dec_name_dict[data_id]
             if name not in instantiated_decoders:
                 if name not in globals():
-                    self.missing_decoders.append(data_id)
+                    self.missing_decoders.add(data_id)
                     continue
                 decoder = globals()[name]
                 instantiated_decoders[name] = decoder(header=self.header)
@@ -378,6 +765,19 @@ class OrcaStreamer(DataStreamer):
             if key not in good_buffers:
                 log.warning(f"buffer for {key} has no decoder")
         log.debug(f"rb_lib = {self.rb_lib}")
+        self._id_action = {
+            data_id: (self.decoder_id_dict[data_id], rbl)
+            for data_id, rbl in self.rbl_id_dict.items()
+        }
+
+        # lookup table of the data IDs read_packet() has to look at, indexed by
+        # data_id >> 18 (short packets have the top bit set, long ones don't)
+        self._wanted_ids = np.zeros(1 << 14, dtype=np.bool_)
+        for data_id in [*self.decoder_id_dict.keys(), *self.missing_decoders]:
+            if 0 <= data_id < (1 << 32):  # others never match a packet header
+                self._wanted_ids[data_id >> 18] = True
+        self._next_wanted = None
+        self._next_wanted_window = _next_wanted_min_window
 
         # return header raw buffer
         if "OrcaHeaderDecoder" in rb_lib:
@@ -393,6 +793,42 @@ class OrcaStreamer(DataStreamer):
         rb.loc = 1  # we have filled this buffer
         return [rb]
 
+    def _scan_ahead(self, n_packets: int) -> None:
+        """Locate up to `n_packets` packets past the last known one.
+
+        Only for memory-mapped streams. Does not move the read position.
+        """
+        if self._n_packet_locs == 0:
+            start = 0
+        else:
+            last = int(self._packet_locs[self._n_packet_locs - 1]) >> 2
+            start = last + orca_packet.decode_header(self._words[last])[1]
+            if start == last:  # zero-length packet: cannot look past it
+                return
+        locs, _ = _scan_packet_locs(self._words, start, n_packets)
+        self._add_packet_locs(locs * 4)
+
+    def _update_next_wanted(self, index: int) -> None:
+        """Index the packets :meth:`read_packet` needs to look at.
+
+        For memory-mapped streams, locates the packets in a window starting at
+        packet `index` and stores, for each of them, the index of the first
+        packet at or after it whose data ID is either decodeable or lacks a
+        decoder implementation, or the end of the window if there is none. All
+        other packets are skipped over without being looked at. The window
+        doubles each time it is moved, up to a maximum size.
+        """
+        stop = index + self._next_wanted_window
+        if stop > self._n_packet_locs:
+            self._scan_ahead(stop - self._n_packet_locs)
+        stop = min(stop, self._n_packet_locs)
+        headers = self._words[self._packet_locs[index:stop] >> 2]
+        self._next_wanted = _find_next_wanted(headers, self._wanted_ids) + index
+        self._next_wanted_start = index
+        self._next_wanted_window = min(
+            2 * self._next_wanted_window, _next_wanted_max_window
+        )
+
     def read_packet(self) -> bool:
         """Read a packet of data.
 
@@ -400,26 +836,44 @@ class OrcaStreamer(DataStreamer):
         """
         # read until we get a decodeable packet
         while True:
+            if self._words is not None and self._wanted_ids is not None:
+                # mapped file: jump straight to the next packet we care about
+                index = self.packet_id + 1
+                offset = index - self._next_wanted_start
+                if self._next_wanted is None or not (
+                    0 <= offset < len(self._next_wanted)
+                ):
+                    self._update_next_wanted(index)
+                    offset = 0
+                if offset < len(self._next_wanted):
+                    # stop at the end of the window at the latest
+                    target = min(
+                        int(self._next_wanted[offset]),
+                        self._next_wanted_start + len(self._next_wanted) - 1,
+                    )
+                    if target > index:
+                        # account for the headers that would have been read
+                        self.n_bytes_read += 4 * int(target - index)
+                        self.in_stream.pos = int(self._packet_locs[target])
+                        self.packet_id = target - 1
             packet = self.load_packet(skip_unknown_ids=True)
             if packet is None:
                 return False
 
             # look up the data id, decoder, and rbl
-            data_id = orca_packet.get_data_id(packet, shift=False)
-            log.debug(
-                f"packet {self.packet_id}: data_id = {data_id}, decoder = {'None' if data_id not in self.decoder_id_dict else type(self.decoder_id_dict[data_id]).__name__}"
-            )
+            data_id = self._last_data_id  # set by load_packet()
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug(
+                    f"packet {self.packet_id}: data_id = {data_id}, decoder = {'None' if data_id not in self.decoder_id_dict else type(self.decoder_id_dict[data_id]).__name__}"
+                )
+            action = self._id_action.get(data_id)
+            if action is not None:
+                break
             if data_id in self.missing_decoders:
-                name = self.header.get_id_to_decoder_name_dict(shift_data_id=False)[
-                    data_id
-                ]
+                name = self._id_to_dec_name_dict[data_id]
                 log.warning(f"no implementation of {name}, packets were skipped")
-                continue
-            if data_id in self.rbl_id_dict:
-                break
 
         # now decode
-        decoder = self.decoder_id_dict[data_id]
-        rbl = self.rbl_id_dict[data_id]
+        decoder, rbl = action
         self.any_full |= decoder.decode_packet(packet, self.packet_id, rbl)
         return True
@@ -10,6 +10,9 @@ from tempfile import gettempdir
 import numpy as np
 import pytest
 from legendtestdata import LegendTestData
+from lgdo import lh5
+
+from daq2lh5.fc.fc_event_decoder import fc_decoded_values
 
 _tmptestdir = os.path.join(
     gettempdir(), f"daq2lh5-tests-{getuser()}-{str(uuid.uuid4())}"
@@ -34,6 +37,20 @@ def lgnd_test_data():
     return ldata
 
 
+@pytest.fixture(scope="session")
+def lh5_store():
+    return lh5.LH5Store()
+
+
+@pytest.fixture
+def fc_values_patch():
+    """Yield :data:`fc_decoded_values`, restoring it after the test."""
+    snapshot = copy.deepcopy(fc_decoded_values)
+    yield fc_decoded_values
+    fc_decoded_values.clear()
+    fc_decoded_values.update(snapshot)
+
+
 @pytest.fixture(scope="session")
 def compare_numba_vs_python():
     def numba_vs_python(func, *inputs):
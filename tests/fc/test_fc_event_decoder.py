@@ -1,7 +1,10 @@
+from types import SimpleNamespace
+
 import lgdo
 import numpy as np
 import pytest
 
+from daq2lh5.buffer_processor.buffer_processor import buffer_processor
 from daq2lh5.fc.fc_event_decoder import FCEventDecoder
 from daq2lh5.raw_buffer import RawBuffer
 
@@ -113,3 +116,126 @@ def test_values(event_rbkd, fcio_obj):
         assert tbl["waveform"]["t0"].nda[loc] == 0
         assert tbl["waveform"]["dt"].nda[loc] == 16
         assert np.array_equal(tbl["waveform"]["values"].nda[loc], fc.traces[ch])
+
+
+def _fake_fcio(rng, nadcs, nsamples):
+    """A stand-in for :class:`fcutils.fcio` holding one random event."""
+    fc = SimpleNamespace(
+        nsamples=nsamples,
+        eventnumber=int(rng.integers(1000)),
+        eventtime=rng.random(),
+        runtime=rng.random(),
+        numtraces=nadcs,
+        tracelist=np.arange(nadcs, dtype="int16"),
+        baseline=rng.integers(2**16, size=nadcs).astype("uint16"),
+        daqenergy=rng.integers(2**16, size=nadcs).astype("uint16"),
+        traces=rng.integers(2**16, size=(nadcs, nsamples)).astype("uint16"),
+        deadtime=rng.random(),
+    )
+    for name in [
+        "timestamp_pps",
+        "timestamp_ticks",
+        "timestamp_maxticks",
+        "timeoffset_mu_sec",
+        "timeoffset_mu_usec",
+        "timeoffset_master_sec",
+        "timeoffset_dt_mu_usec",
+        "timeoffset_abs_mu_usec",
+        "timeoffset_start_sec",
+        "timeoffset_start_usec",
+        "deadregion_start_pps",
+        "deadregion_start_ticks",
+        "deadregion_stop_pps",
+        "deadregion_stop_ticks",
+        "deadregion_maxticks",
+    ]:
+        setattr(fc, name, int(rng.integers(1000)))
+    return fc
+
+
+def test_decoding_after_dtype_conv():
+    # buffer processing may replace column arrays between two flushes
+    nadcs, nsamples = 4, 10
+    fc_config = lgdo.Struct(
+        {"nadcs": lgdo.Scalar(nadcs), "nsamples": lgdo.Scalar(nsamples)}
+    )
+    decoder = FCEventDecoder()
+    decoder.set_file_config(fc_config)
+
+    rb = RawBuffer(
+        lgdo=decoder.make_lgdo(size=5 * nadcs),
+        proc_spec={"dtype_conv": {"daqenergy": "uint32"}},
+    )
+    rbkd = {ch: rb for ch in range(nadcs)}
+
+    rng = np.random.default_rng(42)
+    for flush in range(3):
+        events = [_fake_fcio(rng, nadcs, nsamples) for _ in range(5)]
+        for packet_id, fc in enumerate(events):
+            decoder.decode_packet(fcio=fc, evt_rbkd=rbkd, packet_id=packet_id)
+
+        tbl = buffer_processor(rb)
+        assert tbl["daqenergy"].nda.dtype == np.uint32
+        assert np.array_equal(
+            tbl["daqenergy"].nda[: rb.loc],
+            np.concatenate([fc.daqenergy for fc in events]),
+        )
+        assert np.array_equal(
+            tbl["waveform"]["values"].nda[: rb.loc],
+            np.concatenate([fc.traces for fc in events]),
+        )
+        rb.loc = 0
+
+
+def test_decoding_after_rbkd_change():
+    nadcs, nsamples = 4, 10
+    fc_config = lgdo.Struct(
+        {"nadcs": lgdo.Scalar(nadcs), "nsamples": lgdo.Scalar(nsamples)}
+    )
+    decoder = FCEventDecoder()
+    decoder.set_file_config(fc_config)
+
+    def make_rb():
+        return RawBuffer(lgdo=decoder.make_lgdo(size=nadcs))
+
+    rng = np.random.default_rng(42)
+    rbkd = {ch: make_rb() for ch in range(nadcs)}
+    decoder.decode_packet(
+        fcio=_fake_fcio(rng, nadcs, nsamples), evt_rbkd=rbkd, packet_id=0
+    )
+
+    # re-point a channel to a new buffer in the same dict
+    old_rb = rbkd[2]
+    rbkd[2] = make_rb()
+    fc = _fake_fcio(rng, nadcs, nsamples)
+    decoder.decode_packet(fcio=fc, evt_rbkd=rbkd, packet_id=1)
+    assert old_rb.loc == 1
+    assert rbkd[2].loc == 1
+    assert rbkd[2].lgdo["daqenergy"].nda[0] == fc.daqenergy[2]
+
+    # a new dict with the same length
+    rbkd = {ch: make_rb() for ch in range(nadcs)}
+    fc = _fake_fcio(rng, nadcs, nsamples)
+    decoder.decode_packet(fcio=fc, evt_rbkd=rbkd, packet_id=2)
+    for ch, rb in rbkd.items():
+        assert rb.loc == 1
+        assert rb.lgdo["packet_id"].nda[0] == 2
+        assert rb.lgdo["daqenergy"].nda[0] == fc.daqenergy[ch]
+
+
+def test_decoding_bad_channel():
+    nadcs, nsamples = 4, 10
+    fc_config = lgdo.Struct(
+        {"nadcs": lgdo.Scalar(nadcs), "nsamples": lgdo.Scalar(nsamples)}
+    )
+    decoder = FCEventDecoder()
+    decoder.set_file_config(fc_config)
+    rb = RawBuffer(lgdo=decoder.make_lgdo(size=2 * nadcs))
+
+    # the event has fewer traces than its tracelist claims
+    fc = _fake_fcio(np.random.default_rng(42), nadcs, nsamples)
+    fc.traces = fc.traces[:2]
+    with pytest.raises(IndexError):
+        decoder.decode_packet(
+            fcio=fc, evt_rbkd={ch: rb for ch in range(nadcs)}, packet_id=0
+        )
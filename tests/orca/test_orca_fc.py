@@ -5,10 +5,8 @@ from daq2lh5.orca import orca_packet
 
 @pytest.fixture(scope="module")
 def fc_packets(orca_stream):
-    packets = []
-    packets.append(orca_stream.load_packet(3).copy())  # config
-    packets.append(orca_stream.load_packet(4).copy())  # status
-    packets.append(orca_stream.load_packet(13).copy())  # waveform
+    # config, status and waveform
+    packets = orca_stream.load_packets([3, 4, 13])
     orca_stream.close_stream()  # avoid warning that file is still open
     return packets
 
@@ -1,4 +1,8 @@
+import os
+import shutil
+
 from daq2lh5.orca import orca_packet
+from daq2lh5.orca.orca_streamer import OrcaStreamer, index_file_suffix
 
 
 def test_orca_packet_funcs(orca_stream):
@@ -11,6 +15,7 @@ def test_orca_packet_funcs(orca_stream):
     assert orca_packet.is_short(packet) is False
     assert orca_packet.get_data_id(packet) == 3
     assert orca_packet.get_n_words(packet) == 4
+    assert orca_packet.decode_header(packet[0]) == (False, 4, 3 << 18)
     assert orca_packet.hex_dump(packet, return_output=True)[-1] == "3 0x63c1977a"
 
     id_dict = orca_stream.header.get_id_to_decoder_name_dict()
@@ -38,4 +43,58 @@ def test_orca_packet_funcs(orca_stream):
     ]
     assert seen == expected
 
+    indices = [910, 1, 5, 1, 911]
+    packets = orca_stream.load_packets(indices)
+    assert packets[-1] is None
+    for ii, packet in zip(indices[:-1], packets):
+        assert (packet == orca_stream.load_packet(ii)).all()
+
     orca_stream.close_stream()  # avoid warning that file is still open
+
+
+def test_orca_index_file(lgnd_test_data, tmptestdir):
+    orca_file = f"{tmptestdir}/index-test.orca"
+    shutil.copyfile(
+        lgnd_test_data.get_path("orca/fc/l200-p02-r008-phy-20230113T174010Z.orca"),
+        orca_file,
+    )
+
+    orstr = OrcaStreamer(use_index_file=True)
+    orstr.set_in_stream(orca_file)
+    orstr.packet_id = -1
+    assert orstr.count_packets() == 911
+    orstr.close_in_stream()
+    assert os.path.exists(orca_file + index_file_suffix)
+
+    orstr = OrcaStreamer(use_index_file=True)
+    orstr.set_in_stream(orca_file)
+    assert len(orstr.packet_locs) == 911
+    assert orstr.load_packet(910) is not None
+    orstr.close_in_stream()
+
+
+def test_orca_read_packet_scans_lazily(lgnd_test_data):
+    orstr = OrcaStreamer()
+    orstr.open_stream(
+        lgnd_test_data.get_path("orca/fc/l200-p02-r008-phy-20230113T174010Z.orca")
+    )
+    for _ in range(3):
+        assert orstr.read_packet()
+    # only the packets just ahead have been located, not the whole file
+    assert 4 <= len(orstr.packet_locs) < 911
+    orstr.close_stream()
+
+
+def test_orca_set_in_stream_resets_packet_locs(lgnd_test_data):
+    orstr = OrcaStreamer()
+    orstr.set_in_stream(
+        lgnd_test_data.get_path("orca/fc/l200-p02-r008-phy-20230113T174010Z.orca")
+    )
+    orstr.packet_id = -1
+    assert orstr.count_packets() == 911
+
+    orstr.set_in_stream(
+        lgnd_test_data.get_path("orca/sis3316/coherent-run1141-bkg.orca")
+    )
+    assert len(orstr.packet_locs) == 0
+    orstr.close_in_stream()
@@ -1,14 +1,16 @@
 import json
 import os
+import shutil
 from pathlib import Path
 
 import h5py
+import hdf5plugin
+import numpy as np
 import pytest
 from lgdo import lh5
 from lgdo.compression import ULEB128ZigZagDiff
 
 from daq2lh5 import build_raw
-from daq2lh5.fc.fc_event_decoder import fc_decoded_values
 
 config_dir = Path(__file__).parent / "configs"
 
@@ -25,29 +27,22 @@ def test_build_raw_basics(lgnd_test_data):
 
 
 def test_build_raw_fc(lgnd_test_data, tmptestdir):
+    in_stream = lgnd_test_data.get_path("fcio/L200-comm-20211130-phy-spms.fcio")
+    out_file = f"{tmptestdir}/L200-comm-20211130-phy-spms.lh5"
+
     build_raw(
-        in_stream=lgnd_test_data.get_path("fcio/L200-comm-20211130-phy-spms.fcio"),
+        in_stream=in_stream,
+        out_spec=out_file,
         overwrite=True,
     )
 
-    out_file = lgnd_test_data.get_path("fcio/L200-comm-20211130-phy-spms.lh5")
-    assert lgnd_test_data.get_path("fcio/L200-comm-20211130-phy-spms.lh5") != ""
+    assert Path(out_file).is_file()
 
     with pytest.raises(FileExistsError):
         build_raw(
-            in_stream=lgnd_test_data.get_path("fcio/L200-comm-20211130-phy-spms.fcio")
+            in_stream=in_stream,
+            out_spec=out_file,
         )
-    os.remove(out_file)
-
-    out_file = f"{tmptestdir}/L200-comm-20211130-phy-spms.lh5"
-
-    build_raw(
-        in_stream=lgnd_test_data.get_path("fcio/L200-comm-20211130-phy-spms.fcio"),
-        out_spec=out_file,
-        overwrite=True,
-    )
-
-    assert os.path.exists(out_file)
 
 
 def test_build_raw_fc_ghissue10(lgnd_test_data, tmptestdir):
@@ -61,7 +56,7 @@ def test_build_raw_fc_ghissue10(lgnd_test_data, tmptestdir):
         overwrite=True,
     )
 
-    assert os.path.exists(out_file)
+    assert Path(out_file).is_file()
 
 
 def test_invalid_user_buffer_size(lgnd_test_data, tmptestdir):
@@ -73,23 +68,23 @@ def test_invalid_user_buffer_size(lgnd_test_data, tmptestdir):
         )
 
 
-def test_build_raw_fc_out_spec(lgnd_test_data, tmptestdir):
+def test_build_raw_fc_out_spec(lgnd_test_data, tmptestdir, lh5_store):
+    in_stream = lgnd_test_data.get_path("fcio/L200-comm-20211130-phy-spms.fcio")
     out_file = f"{tmptestdir}/L200-comm-20211130-phy-spms.lh5"
     out_spec = {
         "FCEventDecoder": {"spms": {"key_list": [[2, 4]], "out_stream": out_file}}
     }
 
     build_raw(
-        in_stream=lgnd_test_data.get_path("fcio/L200-comm-20211130-phy-spms.fcio"),
+        in_stream=in_stream,
         out_spec=out_spec,
         n_max=10,
         overwrite=True,
     )
 
-    store = lh5.LH5Store()
-    lh5_obj, n_rows = store.read("/spms", out_file)
+    lh5_obj, n_rows = lh5_store.read("/spms", out_file)
     assert n_rows == 10
-    assert (lh5_obj["channel"].nda == [2, 3, 4, 2, 3, 4, 2, 3, 4, 2]).all()
+    assert np.array_equal(lh5_obj["channel"].nda, [2, 3, 4, 2, 3, 4, 2, 3, 4, 2])
 
     with open(f"{config_dir}/fc-out-spec.json") as f:
         out_spec = json.load(f)
@@ -99,7 +94,7 @@ def test_build_raw_fc_out_spec(lgnd_test_data, tmptestdir):
     ]["out_stream"].replace("/tmp", f"{tmptestdir}")
 
     build_raw(
-        in_stream=lgnd_test_data.get_path("fcio/L200-comm-20211130-phy-spms.fcio"),
+        in_stream=in_stream,
         out_spec=out_spec,
         n_max=10,
         overwrite=True,
@@ -130,25 +125,30 @@ def test_build_raw_fc_channelwise_out_spec(lgnd_test_data, tmptestdir):
 
 
 def test_build_raw_orca(lgnd_test_data, tmptestdir):
-    build_raw(
-        in_stream=lgnd_test_data.get_path("orca/fc/L200-comm-20220519-phy-geds.orca"),
-        overwrite=True,
-    )
+    in_stream = lgnd_test_data.get_path("orca/fc/L200-comm-20220519-phy-geds.orca")
+
+    # default output goes next to the input: work on a copy
+    os.makedirs(f"{tmptestdir}/orca-default-out", exist_ok=True)
+    in_file = shutil.copy(in_stream, f"{tmptestdir}/orca-default-out")
+    build_raw(in_stream=in_file, overwrite=True)
 
-    assert lgnd_test_data.get_path("orca/fc/L200-comm-20220519-phy-geds.lh5") != ""
+    assert Path(
+        f"{tmptestdir}/orca-default-out/L200-comm-20220519-phy-geds.lh5"
+    ).is_file()
 
     out_file = f"{tmptestdir}/L200-comm-20220519-phy-geds.lh5"
 
     build_raw(
-        in_stream=lgnd_test_data.get_path("orca/fc/L200-comm-20220519-phy-geds.orca"),
+        in_stream=in_stream,
         out_spec=out_file,
         overwrite=True,
     )
 
-    assert os.path.exists(f"{tmptestdir}/L200-comm-20220519-phy-geds.lh5")
+    assert Path(f"{tmptestdir}/L200-comm-20220519-phy-geds.lh5").is_file()
 
 
-def test_build_raw_orca_out_spec(lgnd_test_data, tmptestdir):
+def test_build_raw_orca_out_spec(lgnd_test_data, tmptestdir, lh5_store):
+    in_stream = lgnd_test_data.get_path("orca/fc/L200-comm-20220519-phy-geds.orca")
     out_file = f"{tmptestdir}/L200-comm-20220519-phy-geds.lh5"
     out_spec = {
         "ORFlashCamADCWaveformDecoder": {
@@ -157,16 +157,15 @@ def test_build_raw_orca_out_spec(lgnd_test_data, tmptestdir):
     }
 
     build_raw(
-        in_stream=lgnd_test_data.get_path("orca/fc/L200-comm-20220519-phy-geds.orca"),
+        in_stream=in_stream,
         out_spec=out_spec,
         n_max=10,
         overwrite=True,
     )
 
-    store = lh5.LH5Store()
-    lh5_obj, n_rows = store.read("/geds", out_file)
+    lh5_obj, n_rows = lh5_store.read("/geds", out_file)
     assert n_rows == 10
-    assert (lh5_obj["channel"].nda == [2, 3, 4, 2, 3, 4, 2, 3, 4, 2]).all()
+    assert np.array_equal(lh5_obj["channel"].nda, [2, 3, 4, 2, 3, 4, 2, 3, 4, 2])
 
     with open(f"{config_dir}/orca-out-spec.json") as f:
         out_spec = json.load(f)
@@ -176,79 +175,82 @@ def test_build_raw_orca_out_spec(lgnd_test_data, tmptestdir):
     ]["geds"]["out_stream"].replace("/tmp", f"{tmptestdir}")
 
     build_raw(
-        in_stream=lgnd_test_data.get_path("orca/fc/L200-comm-20220519-phy-geds.orca"),
+        in_stream=in_stream,
         out_spec=out_spec,
         n_max=10,
         overwrite=True,
     )
 
 
-def test_build_raw_hdf5_settings(lgnd_test_data, tmptestdir):
-    build_raw(
-        in_stream=lgnd_test_data.get_path("orca/fc/L200-comm-20220519-phy-geds.orca"),
-        hdf5_settings={"compression": "lzf", "shuffle": False},
-        overwrite=True,
-    )
-
-    with h5py.File(
-        lgnd_test_data.get_path("orca/fc/L200-comm-20220519-phy-geds.lh5")
-    ) as f:
-        assert f["ORFlashCamADCWaveform/abs_delta_mu_usec"].shuffle is False
-        assert f["ORFlashCamADCWaveform/abs_delta_mu_usec"].compression == "lzf"
-
+@pytest.mark.parametrize(
+    "where,field",
+    [("build_raw", "abs_delta_mu_usec"), ("decoded_values", "packet_id")],
+)
+def test_build_raw_hdf5_settings(
+    lgnd_test_data, tmptestdir, fc_values_patch, where, field
+):
+    out_file = f"{tmptestdir}/L200-comm-20220519-phy-geds.lh5"
+    settings = {"shuffle": False, "compression": "lzf"}
 
-def test_build_raw_hdf5_settings_in_decoded_values(lgnd_test_data, tmptestdir):
-    fc_decoded_values["packet_id"]["hdf5_settings"] = {
-        "shuffle": False,
-        "compression": "lzf",
-    }
+    # settings either apply to all fields or go with a single decoded value
+    hdf5_settings = None
+    if where == "build_raw":
+        hdf5_settings = settings
+    else:
+        fc_values_patch[field]["hdf5_settings"] = settings
 
     build_raw(
         in_stream=lgnd_test_data.get_path("orca/fc/L200-comm-20220519-phy-geds.orca"),
+        out_spec=out_file,
+        hdf5_settings=hdf5_settings,
         overwrite=True,
     )
 
-    del fc_decoded_values["packet_id"]["hdf5_settings"]
-
-    with h5py.File(
-        lgnd_test_data.get_path("orca/fc/L200-comm-20220519-phy-geds.lh5")
-    ) as f:
-        assert f["ORFlashCamADCWaveform/packet_id"].shuffle is False
-        assert f["ORFlashCamADCWaveform/packet_id"].compression == "lzf"
+    with h5py.File(out_file, "r") as f:
+        assert f[f"ORFlashCamADCWaveform/{field}"].shuffle is False
+        assert f[f"ORFlashCamADCWaveform/{field}"].compression == "lzf"
 
 
-def test_build_raw_wf_compression_in_decoded_values(lgnd_test_data, tmptestdir):
-    out_file = lgnd_test_data.get_path("orca/fc/L200-comm-20220519-phy-geds.lh5")
+def test_build_raw_wf_compression_in_decoded_values(
+    lgnd_test_data, tmptestdir, lh5_store, fc_values_patch
+):
+    in_stream = lgnd_test_data.get_path("orca/fc/L200-comm-20220519-phy-geds.orca")
+    out_file = f"{tmptestdir}/L200-comm-20220519-phy-geds.lh5"
 
-    fc_decoded_values["waveform"].setdefault("hdf5_settings", {"values": {}, "t0": {}})
-    fc_decoded_values["waveform"]["hdf5_settings"] = {
-        "values": {"shuffle": False, "compression": "lzf"},
+    fc_values_patch["waveform"].setdefault("hdf5_settings", {"values": {}, "t0": {}})
+    fc_values_patch["waveform"]["hdf5_settings"] = {
+        "values": {
+            "shuffle": False,
+            **hdf5plugin.Blosc(
+                cname="lz4", clevel=1, shuffle=hdf5plugin.Blosc.BITSHUFFLE
+            ),
+        },
         "t0": {"shuffle": True, "compression": None},
     }
 
     build_raw(
-        in_stream=lgnd_test_data.get_path("orca/fc/L200-comm-20220519-phy-geds.orca"),
+        in_stream=in_stream,
+        out_spec=out_file,
         overwrite=True,
     )
 
-    with h5py.File(out_file) as f:
+    with h5py.File(out_file, "r") as f:
         assert f["ORFlashCamADCWaveform/waveform/values"].shuffle is False
-        assert f["ORFlashCamADCWaveform/waveform/values"].compression == "lzf"
+        dcpl = f["ORFlashCamADCWaveform/waveform/values"].id.get_create_plist()
+        assert dcpl.get_filter_by_id(hdf5plugin.BLOSC_ID) is not None
         assert f["ORFlashCamADCWaveform/waveform/t0"].shuffle is True
         assert f["ORFlashCamADCWaveform/waveform/t0"].compression is None
 
-    fc_decoded_values["waveform"].setdefault("compression", {"values": None})
-    fc_decoded_values["waveform"]["compression"]["values"] = ULEB128ZigZagDiff()
+    fc_values_patch["waveform"].setdefault("compression", {"values": None})
+    fc_values_patch["waveform"]["compression"]["values"] = ULEB128ZigZagDiff()
 
     build_raw(
-        in_stream=lgnd_test_data.get_path("orca/fc/L200-comm-20220519-phy-geds.orca"),
+        in_stream=in_stream,
+        out_spec=out_file,
         overwrite=True,
     )
 
-    del fc_decoded_values["waveform"]["hdf5_settings"]
-    del fc_decoded_values["waveform"]["compression"]
-
-    with h5py.File(out_file) as f:
+    with h5py.File(out_file, "r") as f:
         assert (
             f[
                 "ORFlashCamADCWaveform/waveform/values/encoded_data/flattened_data"
@@ -258,39 +260,40 @@ def test_build_raw_wf_compression_in_decoded_values(lgnd_test_data, tmptestdir):
         assert f["ORFlashCamADCWaveform/waveform/t0"].shuffle is True
         assert f["ORFlashCamADCWaveform/waveform/t0"].compression is None
 
-    store = lh5.LH5Store()
-    obj, _ = store.read(
+    obj, _ = lh5_store.read(
         "ORFlashCamADCWaveform/waveform/values", out_file, decompress=False
     )
     assert obj.attrs["codec"] == "uleb128_zigzag_diff"
 
 
 def test_build_raw_compass(lgnd_test_data, tmptestdir):
+    in_stream = lgnd_test_data.get_path("compass/compass_test_data.BIN")
+    config_file = lgnd_test_data.get_path("compass/compass_test_data_settings.xml")
+
+    # default output goes next to the input: work on a copy
+    os.makedirs(f"{tmptestdir}/compass-default-out", exist_ok=True)
+    in_file = shutil.copy(in_stream, f"{tmptestdir}/compass-default-out")
     build_raw(
-        in_stream=lgnd_test_data.get_path("compass/compass_test_data.BIN"),
+        in_stream=in_file,
         overwrite=True,
-        compass_config_file=lgnd_test_data.get_path(
-            "compass/compass_test_data_settings.xml"
-        ),
+        compass_config_file=config_file,
     )
 
-    assert lgnd_test_data.get_path("compass/compass_test_data.lh5") != ""
+    assert Path(f"{tmptestdir}/compass-default-out/compass_test_data.lh5").is_file()
 
     out_file = f"{tmptestdir}/compass_test_data.lh5"
 
     build_raw(
-        in_stream=lgnd_test_data.get_path("compass/compass_test_data.BIN"),
+        in_stream=in_stream,
         out_spec=out_file,
         overwrite=True,
-        compass_config_file=lgnd_test_data.get_path(
-            "compass/compass_test_data_settings.xml"
-        ),
+        compass_config_file=config_file,
     )
 
-    assert os.path.exists(f"{tmptestdir}/compass_test_data.lh5")
+    assert Path(f"{tmptestdir}/compass_test_data.lh5").is_file()
 
 
-def test_build_raw_compass_out_spec(lgnd_test_data, tmptestdir):
+def test_build_raw_compass_out_spec(lgnd_test_data, tmptestdir, lh5_store):
     out_file = f"{tmptestdir}/compass_test_data.lh5"
     out_spec = {
         "CompassEventDecoder": {"spms": {"key_list": [[0, 1]], "out_stream": out_file}}
@@ -306,13 +309,12 @@ def test_build_raw_compass_out_spec(lgnd_test_data, tmptestdir):
         ),
     )
 
-    store = lh5.LH5Store()
-    lh5_obj, n_rows = store.read("/spms", out_file)
+    lh5_obj, n_rows = lh5_store.read("/spms", out_file)
     assert n_rows == 10
-    assert (lh5_obj["channel"].nda == [0, 1, 0, 1, 0, 1, 0, 1, 0, 1]).all()
+    assert np.array_equal(lh5_obj["channel"].nda, [0, 1, 0, 1, 0, 1, 0, 1, 0, 1])
 
 
-def test_build_raw_compass_out_spec_no_config(lgnd_test_data, tmptestdir):
+def test_build_raw_compass_out_spec_no_config(lgnd_test_data, tmptestdir, lh5_store):
     out_file = f"{tmptestdir}/compass_test_data.lh5"
     out_spec = {
         "CompassEventDecoder": {"spms": {"key_list": [[0, 1]], "out_stream": out_file}}
@@ -325,10 +327,9 @@ def test_build_raw_compass_out_spec_no_config(lgnd_test_data, tmptestdir):
         overwrite=True,
     )
 
-    store = lh5.LH5Store()
-    lh5_obj, n_rows = store.read("/spms", out_file)
+    lh5_obj, n_rows = lh5_store.read("/spms", out_file)
     assert n_rows == 10
-    assert (lh5_obj["channel"].nda == [0, 1, 0, 1, 0, 1, 0, 1, 0, 1]).all()
+    assert np.array_equal(lh5_obj["channel"].nda, [0, 1, 0, 1, 0, 1, 0, 1, 0, 1])
 
 
 def test_build_raw_orca_sis3316(lgnd_test_data, tmptestdir):
@@ -346,4 +347,4 @@ def test_build_raw_orca_sis3316(lgnd_test_data, tmptestdir):
         overwrite=True,
     )
 
-    assert os.path.exists(out_file)
+    assert Path(out_file).is_file()
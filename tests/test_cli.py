@@ -1,12 +1,24 @@
 import os
 import subprocess
+import sys
 from pathlib import Path
 
+import pytest
+
+from daq2lh5.cli import daq2lh5_cli
+
 config_dir = Path(__file__).parent / "configs"
 
 
+def test_build_raw_cli_help(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["legend-daq2lh5", "--help"])
+    with pytest.raises(SystemExit) as exc_info:
+        daq2lh5_cli()
+    assert exc_info.value.code == 0
+    assert "usage: daq2lh5" in capsys.readouterr().out
+
+
 def test_build_raw_cli(lgnd_test_data, tmptestdir):
-    subprocess.check_call(["legend-daq2lh5", "--help"])
     subprocess.check_call(
         [
             "legend-daq2lh5",